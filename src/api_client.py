@@ -1,20 +1,38 @@
 import requests
 import logging
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 class DeepSeekClient:
     def __init__(self, config):
         self.config = config
-        self.base_url = config.get("api_endpoint", "https://api.deepseek.com/v1")
         self.timeout = 15
+        self.session = self._create_session()
+        self.update_config()
+
+    def _create_session(self):
+        """创建复用连接的HTTP会话"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=2, backoff_factor=0.3)
+        )
+        session.mount("https://", adapter)
+        return session
+
+    def update_config(self):
+        """根据当前配置刷新端点和请求头"""
+        self.base_url = self.config.get("api_endpoint", "https://api.deepseek.com/v1")
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.config.get('api_key', '')}",
+            "Content-Type": "application/json"
+        })
 
     def analyze_image(self, image_data):
         """分析学习材料"""
         endpoint = f"{self.base_url}/analyze"
-        headers = {
-            "Authorization": f"Bearer {self.config.get('api_key', '')}",
-            "Content-Type": "application/json"
-        }
-        
+
         payload = {
             "image": image_data,
             "parameters": {
@@ -24,14 +42,17 @@ class DeepSeekClient:
         }
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 endpoint,
                 json=payload,
-                headers=headers,
                 timeout=self.timeout
             )
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             logging.error(f"API请求失败: {str(e)}")
-            raise RuntimeError("分析服务暂时不可用") from e
\ No newline at end of file
+            raise RuntimeError("分析服务暂时不可用") from e
+
+    def close(self):
+        """关闭HTTP会话"""
+        self.session.close()
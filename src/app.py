@@ -1,15 +1,32 @@
-import base64
-import cv2
 import flet as ft
+import gc
 import logging
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from threading import Lock
 from .camera_manager import CameraManager
 from .api_client import DeepSeekClient
-from .config_manager import ConfigManager
-from .utils import check_image_quality
+from .config_manager import get_config
+from .utils import check_image_quality, encode_base64, encode_jpeg, encode_preview
+
+# 预览画面尺寸与编码质量
+PREVIEW_SIZE = (640, 480)
+PREVIEW_JPEG_QUALITY = 70
+# 上传分析的图像编码质量
+CAPTURE_JPEG_QUALITY = 90
+# 同时进行编码与分析的最大线程数
+ANALYSIS_WORKERS = 2
+# 合并界面刷新请求的等待时间(秒)
+UPDATE_DEBOUNCE_INTERVAL = 0.033
+# 日志区最短刷新间隔(秒)
+LOG_FLUSH_INTERVAL = 0.2
+# 日志区保留的条目数及每次批量裁剪的条目数
+LOG_MAX_ENTRIES = 100
+LOG_TRIM_BATCH = 50
+# 预览帧超过该时长(秒)未更新即视为摄像头已停止出图
+FRAME_MAX_AGE = 0.5
 
 class StudyAssistantApp:
     def __init__(self, page: ft.Page):
@@ -19,18 +36,34 @@ class StudyAssistantApp:
         self.page.window_height = 800
         
         # 初始化模块
-        self.cfg = ConfigManager()
+        self.cfg = get_config()
         self.camera_mgr = None  # 延迟初始化
         self.api_client = None  # 延迟初始化
         
         # 状态变量
         self.is_previewing = False
         self.preview_lock = Lock()  # 添加锁以保护并发访问
-        self.auto_capture_timer = None
+        self.auto_capture_stop = None  # 自动捕获线程的停止事件
         self.update_ui_timer = None
         self.frame_buffer = None
         self.frame_buffer_lock = Lock()
+        self.frame_seq = 0  # 预览帧序号，每收到新帧加1
+        self.frame_time = 0.0  # 最新预览帧的到达时间
+        self.last_capture_seq = 0  # 最近一次抓拍所用帧的序号
+        self.last_preview_frame = None  # 最近一次已显示的预览帧
         self.latest_result = None  # 存储最新的分析结果
+        self.result_seq = 0  # 当前显示结果对应的帧序号
+        self.result_lock = Lock()
+        self.update_pending = False  # 是否已有待执行的界面刷新
+        self.update_lock = Lock()
+        self.log_dirty = False  # 是否有未刷新到界面的日志
+        self.last_log_flush = 0.0
+        self.log_flush_pending = False  # 是否已安排补刷日志
+        self.log_timestamp = (None, "")  # (秒, 格式化时间) 缓存
+        self.analysis_executor = ThreadPoolExecutor(
+            max_workers=ANALYSIS_WORKERS,
+            thread_name_prefix="analysis"
+        )  # 复用分析线程，避免每次抓拍新建线程
         
         # 初始化界面
         self._init_ui()
@@ -39,6 +72,11 @@ class StudyAssistantApp:
         # 初始化服务
         self._init_services()
         
+        # 启动期创建的对象(控件树、模块等)常驻内存，移出GC扫描范围以缩短全量回收停顿
+        # 冻结前先回收已成为垃圾的循环引用，否则它们会随冻结永久驻留
+        gc.collect()
+        gc.freeze()
+        
     def _init_services(self):
         """初始化服务组件"""
         try:
@@ -77,8 +115,8 @@ class StudyAssistantApp:
         # 图像预览区
         self.img_preview = ft.Image(
             src="assets/placeholder.png", 
-            width=640, 
-            height=480,
+            width=PREVIEW_SIZE[0], 
+            height=PREVIEW_SIZE[1],
             fit=ft.ImageFit.CONTAIN
         )
         
@@ -246,6 +284,27 @@ class StudyAssistantApp:
         self.page.add(self.settings_view)
         self.page.update()
 
+    def _schedule_update(self):
+        """合并短时间内的多次界面刷新请求"""
+        with self.update_lock:
+            if self.update_pending:
+                return
+            self.update_pending = True
+            
+        timer = threading.Timer(UPDATE_DEBOUNCE_INTERVAL, self._flush_update)
+        timer.daemon = True
+        timer.start()
+
+    def _flush_update(self):
+        """执行合并后的界面刷新"""
+        with self.update_lock:
+            self.update_pending = False
+        self.page.update()
+
+    def _is_view_visible(self, view):
+        """判断指定视图当前是否显示"""
+        return bool(self.page.controls) and self.page.controls[0] == view
+
     def _bind_events(self):
         """绑定事件处理"""
         self.page.on_close = self._on_app_close
@@ -266,7 +325,7 @@ class StudyAssistantApp:
         except ValueError:
             self.interval_input.value = str(self.cfg.get("auto_capture_interval", 10))
             self._log("请输入有效的数字")
-        self.page.update()
+        self._schedule_update()
 
     def _start_camera_preview(self):
         """启动摄像头预览"""
@@ -287,7 +346,7 @@ class StudyAssistantApp:
             # 启用控制按钮
             self.capture_btn.disabled = False
             self.auto_switch.disabled = False
-            self.page.update()
+            self._schedule_update()
             
             self._log("摄像头预览已启动")
         except Exception as e:
@@ -306,6 +365,8 @@ class StudyAssistantApp:
                 if frame is not None:
                     with self.frame_buffer_lock:
                         self.frame_buffer = frame
+                        self.frame_seq += 1
+                        self.frame_time = time.monotonic()
                     self._update_camera_status(True)
             except Exception as e:
                 self._log(f"获取画面错误: {str(e)}")
@@ -322,9 +383,13 @@ class StudyAssistantApp:
             return
             
         try:
-            with self.frame_buffer_lock:
-                if self.frame_buffer is not None:
-                    self._update_image(self.frame_buffer)
+            # 预览图只在主视图可见时编码和刷新
+            if self._is_view_visible(self.main_view):
+                # 锁内只读取引用，编码在锁外进行，避免阻塞预览线程
+                with self.frame_buffer_lock:
+                    frame = self.frame_buffer
+                if frame is not None:
+                    self._update_image(frame)
         except Exception as e:
             logging.error(f"UI更新错误: {str(e)}")
         
@@ -335,11 +400,16 @@ class StudyAssistantApp:
 
     def _update_image(self, frame):
         """更新界面图像显示"""
+        # 摄像头尚未产生新帧时跳过重复的编码与刷新
+        if frame is self.last_preview_frame:
+            return
+            
         try:
-            _, buffer = cv2.imencode('.jpg', frame)
-            img_base64 = base64.b64encode(buffer).decode('utf-8')
-            self.img_preview.src = f"data:image/jpeg;base64,{img_base64}"
-            self.page.update()
+            self.img_preview.src_base64 = encode_preview(
+                frame, PREVIEW_SIZE, PREVIEW_JPEG_QUALITY
+            )
+            self.img_preview.update()
+            self.last_preview_frame = frame
         except Exception as e:
             logging.error(f"图像转换错误: {str(e)}")
 
@@ -350,26 +420,25 @@ class StudyAssistantApp:
     def capture_image(self):
         """捕获图像并处理"""
         try:
-            frame = self.camera_mgr.get_frame()
-            if frame is None:
+            # 直接取预览缓存的最新帧，避免与预览线程争抢摄像头队列
+            with self.frame_buffer_lock:
+                frame = self.frame_buffer
+                seq = self.frame_seq
+                # 摄像头停止出图时缓存帧不会清空，需按到达时间判断是否仍是当前画面
+                stale = time.monotonic() - self.frame_time > FRAME_MAX_AGE
+                repeated = seq == self.last_capture_seq
+                if frame is not None and not stale and not repeated:
+                    self.last_capture_seq = seq
+            if frame is None or stale:
                 self._log("无法获取图像，请检查摄像头")
                 return
-                
-            quality_check, sharpness, brightness = check_image_quality(frame)
-            if not quality_check:
-                self._log(f"图像质量不合格 (清晰度: {sharpness:.1f}, 亮度: {brightness:.1f})")
-                self._show_error_dialog(
-                    "图像质量检查", 
-                    f"图像质量不合格:\n清晰度: {sharpness:.1f}\n亮度: {brightness:.1f}\n\n请调整拍摄环境后重试。"
-                )
+            if repeated:
+                self._log("摄像头画面未更新，已跳过本次捕获")
                 return
                 
-            self._log("正在分析图像...")
-            threading.Thread(
-                target=self._process_image, 
-                args=(frame.copy(),),  # 复制frame避免线程安全问题
-                daemon=True
-            ).start()
+            # 质量检测与编码都在分析线程中进行，避免阻塞界面事件
+            # 预览线程只会替换frame_buffer引用而不会原地修改，无需复制
+            self.analysis_executor.submit(self._process_image, frame, seq)
         except Exception as e:
             self._log(f"捕获图像失败: {str(e)}")
 
@@ -381,54 +450,68 @@ class StudyAssistantApp:
                 if interval < 1:
                     interval = 1
                     self.interval_input.value = "1"
-                    self.page.update()
+                    self._schedule_update()
                     
                 self._log(f"自动捕获已启用, 间隔: {interval}秒")
-                self._schedule_auto_capture(interval)
+                self._start_auto_capture(interval)
             except ValueError:
                 self.auto_switch.value = False
                 self._log("请输入有效的时间间隔")
-                self.page.update()
+                self._schedule_update()
         else:
-            self._cancel_auto_capture()
+            self._stop_auto_capture()
             self._log("自动捕获已禁用")
 
-    def _schedule_auto_capture(self, interval):
-        """调度自动捕获任务"""
-        self._cancel_auto_capture()  # 确保取消之前的定时器
-        
-        self.auto_capture_timer = threading.Timer(interval, self._auto_capture_task)
-        self.auto_capture_timer.daemon = True
-        self.auto_capture_timer.start()
+    def _start_auto_capture(self, interval):
+        """启动自动捕获线程"""
+        self._stop_auto_capture()  # 确保停止之前的捕获线程
+        
+        self.auto_capture_stop = threading.Event()
+        threading.Thread(
+            target=self._auto_capture_loop,
+            args=(interval, self.auto_capture_stop),
+            daemon=True
+        ).start()
 
-    def _cancel_auto_capture(self):
-        """取消自动捕获"""
-        if self.auto_capture_timer:
-            self.auto_capture_timer.cancel()
-            self.auto_capture_timer = None
+    def _stop_auto_capture(self):
+        """停止自动捕获"""
+        if self.auto_capture_stop:
+            self.auto_capture_stop.set()
+            self.auto_capture_stop = None
 
-    def _auto_capture_task(self):
-        """自动捕获任务"""
-        if not self.auto_switch.value:
-            return
+    def _auto_capture_loop(self, interval, stop_event):
+        """自动捕获循环 (单一线程按间隔等待，停止事件可随时打断)"""
+        while not stop_event.wait(interval):
+            if not self.auto_switch.value:
+                return
+                
+            self.capture_image()
             
-        self.capture_image()
-        
-        try:
-            interval = int(self.interval_input.value)
-            if interval < 1:
-                interval = 1
-            self._schedule_auto_capture(interval)
-        except ValueError:
-            self._log("自动捕获异常: 无效的间隔值")
-            self.auto_switch.value = False
-            self.page.update()
+            try:
+                interval = max(1, int(self.interval_input.value))
+            except ValueError:
+                self._log("自动捕获异常: 无效的间隔值")
+                self.auto_switch.value = False
+                self._schedule_update()
+                return
 
-    def _process_image(self, frame):
-        """处理图像分析流程"""
+    def _process_image(self, frame, seq):
+        """处理图像分析流程 (seq为所用帧的序号)"""
         try:
-            _, buffer = cv2.imencode('.jpg', frame)
-            img_data = base64.b64encode(buffer).decode('utf-8')
+            quality_check, sharpness, brightness = check_image_quality(frame)
+            if not quality_check:
+                self._log(f"图像质量不合格 (清晰度: {sharpness:.1f}, 亮度: {brightness:.1f})")
+                self._show_error_dialog(
+                    "图像质量检查", 
+                    f"图像质量不合格:\n清晰度: {sharpness:.1f}\n亮度: {brightness:.1f}\n\n请调整拍摄环境后重试。"
+                )
+                return
+                
+            self._log("正在分析图像...")
+            buffer = encode_jpeg(
+                frame, CAPTURE_JPEG_QUALITY, subsampling="422", optimize=True
+            )
+            img_data = encode_base64(buffer)
             
             self._log("正在调用API分析图像...")
             # 检查API配置
@@ -441,9 +524,14 @@ class StudyAssistantApp:
             result = self.api_client.analyze_image(img_data)
             self._log("分析完成")
             
-            # 保存结果并更新显示
-            self.latest_result = result
-            self._update_result_display(result)
+            # 保存结果并更新显示 (多个分析线程可能乱序完成，较早抓拍的结果不覆盖较新的结果)
+            with self.result_lock:
+                if seq < self.result_seq:
+                    self._log("已有更新的分析结果，忽略本次结果")
+                    return
+                self.result_seq = seq
+                self.latest_result = result
+                self._update_result_display(result)
         except Exception as e:
             self._log(f"处理失败: {str(e)}")
             self._show_error_dialog("处理错误", f"图像分析失败: {str(e)}")
@@ -486,8 +574,8 @@ class StudyAssistantApp:
         )
         
         # 确保更新UI
-        if self.page.controls and self.page.controls[0] == self.main_view:
-            self.page.update()
+        if self._is_view_visible(self.main_view):
+            self.result_card.update()
 
     def _save_analysis(self, e=None):
         """保存分析结果"""
@@ -517,23 +605,52 @@ class StudyAssistantApp:
 
     def _log(self, message):
         """记录日志"""
-        timestamp = time.strftime("%H:%M:%S")
-        self.log_view.controls.append(ft.Text(f"[{timestamp}] {message}"))
+        self.log_view.controls.append(ft.Text(f"[{self._get_log_timestamp()}] {message}"))
         
-        # 限制日志条目数量，避免内存问题
-        if len(self.log_view.controls) > 100:
-            self.log_view.controls.pop(0)
+        # 限制日志条目数量，避免内存问题 (超出上限后批量裁剪，而非每条都从头部删除)
+        if len(self.log_view.controls) > LOG_MAX_ENTRIES + LOG_TRIM_BATCH:
+            del self.log_view.controls[:LOG_TRIM_BATCH]
             
-        # 只有在设置页面可见时才更新UI
-        if self.page.controls and self.page.controls[0] == self.settings_view:
-            self.page.update()
+        # 只有在设置页面可见时才更新UI，且限制刷新频率
+        self.log_dirty = True
+        if self._is_view_visible(self.settings_view):
+            delay = LOG_FLUSH_INTERVAL - (time.monotonic() - self.last_log_flush)
+            if delay <= 0:
+                self._flush_log()
+            elif not self.log_flush_pending:
+                # 被节流的日志由一次性定时器补刷，不依赖预览是否在运行
+                self.log_flush_pending = True
+                timer = threading.Timer(delay, self._flush_log_pending)
+                timer.daemon = True
+                timer.start()
             
         logging.info(message)
 
+    def _flush_log(self):
+        """将积压的日志刷新到界面"""
+        self.log_dirty = False
+        self.last_log_flush = time.monotonic()
+        self.log_view.update()
+
+    def _flush_log_pending(self):
+        """补刷节流期间积压的日志"""
+        self.log_flush_pending = False
+        if self.log_dirty and self._is_view_visible(self.settings_view):
+            self._flush_log()
+
+    def _get_log_timestamp(self):
+        """获取日志时间戳 (同一秒内复用格式化结果)"""
+        now = int(time.time())
+        second, text = self.log_timestamp
+        if second != now:
+            text = time.strftime("%H:%M:%S", time.localtime(now))
+            self.log_timestamp = (now, text)
+        return text
+
     def _on_app_close(self, e):
         """应用关闭时的清理操作"""
         # 停止自动捕获
-        self._cancel_auto_capture()
+        self._stop_auto_capture()
         
         # 停止UI更新定时器
         if self.update_ui_timer:
@@ -543,6 +660,9 @@ class StudyAssistantApp:
         with self.preview_lock:
             self.is_previewing = False
         
+        # 停止分析线程，丢弃尚未开始的任务
+        self.analysis_executor.shutdown(wait=False, cancel_futures=True)
+        
         # 停止相机
         if self.camera_mgr:
             try:
@@ -553,6 +673,10 @@ class StudyAssistantApp:
         # 保存配置
         self._save_config()
         
+        # 关闭API会话
+        if self.api_client:
+            self.api_client.close()
+        
         # 确认关闭
         return True
         
@@ -569,7 +693,7 @@ class StudyAssistantApp:
             
             # 更新API客户端
             if self.api_client:
-                self.api_client = DeepSeekClient(self.cfg)
+                self.api_client.update_config()
                 
             self._log("配置已保存")
             
@@ -583,6 +707,7 @@ class StudyAssistantApp:
 
     def _update_camera_status(self, connected, error_msg=None):
         """更新摄像头状态显示"""
+        was_visible = self.status_indicator.visible
         if connected:
             self.status_indicator.visible = False
         else:
@@ -593,9 +718,10 @@ class StudyAssistantApp:
             )
             self.status_indicator.visible = True
             
-        # 状态变化时更新UI
-        if self.status_indicator.visible != (not connected):
-            self.page.update()
+        # 状态变化或错误信息更新时只刷新状态指示器
+        if ((self.status_indicator.visible != was_visible or not connected)
+                and self._is_view_visible(self.main_view)):
+            self.status_indicator.update()
     
     def _show_error_dialog(self, title, message):
         """显示错误对话框"""
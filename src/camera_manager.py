@@ -1,47 +1,102 @@
 import cv2
+import logging
 import threading
-from queue import Queue
+from .utils import decode_jpeg, turbojpeg_available
 
 class CameraManager:
     def __init__(self, config):
         self.config = config
         self.cap = None
-        self.frame_queue = Queue(maxsize=1)
+        self.latest_frame = None  # 最新一帧，消费后置空
+        self.frame_lock = threading.Lock()
         self.running = False
+        self.capture_thread = None
+        self.raw_mjpeg = False  # 是否取MJPG原始数据自行解码
         self._init_device()
 
     def _init_device(self):
         """初始化摄像头设备"""
-        self.resolution = (
-            self.config.get("camera_width", 1280),
-            self.config.get("camera_height", 720)
-        )
+        self.resolution = (self.config.camera_width, self.config.camera_height)
+        self.fps = self.config.camera_fps
 
     def start_capture(self, camera_index=0):
         """启动摄像头捕获"""
         self.cap = cv2.VideoCapture(camera_index)
         if not self.cap.isOpened():
             raise RuntimeError(f"无法打开摄像头 (索引: {camera_index})")
+        # 请求MJPG格式以降低USB带宽，驱动只缓冲1帧以减少延迟
+        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        self.raw_mjpeg = self._enable_raw_mjpeg()
         self.running = True
-        threading.Thread(target=self._capture_thread, daemon=True).start()
+        self.capture_thread = threading.Thread(
+            target=self._capture_thread, name="capture", daemon=True
+        )
+        self.capture_thread.start()
+
+    def _enable_raw_mjpeg(self):
+        """
+        在V4L2后端协商到MJPG且libjpeg-turbo可用时，关闭OpenCV内部解码，
+        改为取原始JPEG数据由libjpeg-turbo解码
+        (仅V4L2后端会在此处提前加载libjpeg-turbo，其他后端仍在首次编码时加载)
+        :return: 是否启用
+        """
+        if self.cap.getBackendName() != "V4L2" or not turbojpeg_available():
+            return False
+        if int(self.cap.get(cv2.CAP_PROP_FOURCC)) != cv2.VideoWriter_fourcc(*'MJPG'):
+            return False
+        return self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
 
     def _capture_thread(self):
-        """摄像头捕获线程"""
-        while self.running:
-            ret, frame = self.cap.read()
-            if ret:
-                if self.frame_queue.full():
-                    self.frame_queue.get_nowait()
-                self.frame_queue.put(frame)
+        """摄像头捕获线程 (唯一访问VideoCapture的线程，退出时负责释放)"""
+        decode_failing = False  # 连续解码失败期间只记录一次警告
+        try:
+            while self.running:
+                # 每帧都grab以推进驱动缓冲，保证后续解码的是最新画面
+                if not self.cap.grab():
+                    continue
+                    
+                # 上一帧尚未被取走时跳过解码 (retrieve的解码与色彩转换是主要开销)
+                with self.frame_lock:
+                    if self.latest_frame is not None:
+                        continue
+                        
+                ret, frame = self.cap.retrieve()
+                if not ret:
+                    continue
+                    
+                if self.raw_mjpeg:
+                    try:
+                        frame = decode_jpeg(frame)
+                    except Exception as e:
+                        if not decode_failing:
+                            logging.warning(f"MJPG帧解码失败: {str(e)} (恢复前不再重复记录)")
+                            decode_failing = True
+                        continue
+                    if decode_failing:
+                        logging.info("MJPG帧解码已恢复")
+                        decode_failing = False
+                        
+                with self.frame_lock:
+                    self.latest_frame = frame
+        finally:
+            self.cap.release()
 
     def get_frame(self):
-        """获取当前帧"""
-        return self.frame_queue.get() if not self.frame_queue.empty() else None
+        """获取当前帧 (每帧均为retrieve()新分配的数组，调用方可直接持有引用)"""
+        with self.frame_lock:
+            frame = self.latest_frame
+            self.latest_frame = None
+        return frame
 
     def stop(self):
         """停止捕获"""
         self.running = False
-        if self.cap and self.cap.isOpened():
+        if self.capture_thread:
+            # 由捕获线程自行释放摄像头，避免与进行中的grab()并发访问
+            self.capture_thread.join(timeout=1)
+        elif self.cap and self.cap.isOpened():
             self.cap.release()
\ No newline at end of file
@@ -1,16 +1,20 @@
 import json
 import logging
+import os
 from pathlib import Path
 
 class ConfigManager:
+    # 配置文件路径只需计算一次
+    config_path = Path.home() / ".study_assistant" / "config.json"
+
     def __init__(self):
-        self.config_path = Path.home() / ".study_assistant" / "config.json"
         self.config = self._load_config()
+        self._cache_hot_values()
 
     def _load_config(self):
         """加载配置文件"""
         try:
-            if self.config_path.exists():
+            if os.path.exists(self.config_path):
                 with open(self.config_path, 'r') as f:
                     return json.load(f)
             return {}
@@ -18,6 +22,12 @@ class ConfigManager:
             logging.error(f"加载配置失败: {str(e)}")
             return {}
 
+    def _cache_hot_values(self):
+        """将频繁读取的配置项缓存为属性，避免重复的方法调用和字典查找"""
+        self.camera_width = self.config.get("camera_width", 1280)
+        self.camera_height = self.config.get("camera_height", 720)
+        self.camera_fps = self.config.get("camera_fps", 30)
+
     def get(self, key, default=None):
         """获取配置项"""
         return self.config.get(key, default)
@@ -25,9 +35,27 @@ class ConfigManager:
     def save_config(self, new_config):
         """保存配置更新"""
         try:
-            self.config.update(new_config)
+            # 配置没有变化且文件已存在时跳过序列化和写盘
+            updated = {**self.config, **new_config}
+            if updated == self.config and os.path.exists(self.config_path):
+                return
+
+            self.config = updated
+            self._cache_hot_values()
             self.config_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.config_path, 'w') as f:
+            # 先写临时文件再原子替换，避免写入中途崩溃损坏配置
+            tmp_path = self.config_path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
                 json.dump(self.config, f, indent=2)
+            os.replace(tmp_path, self.config_path)
         except Exception as e:
-            logging.error(f"保存配置失败: {str(e)}")
\ No newline at end of file
+            logging.error(f"保存配置失败: {str(e)}")
+
+_instance = None
+
+def get_config():
+    """获取共享的配置管理器 (首次调用时创建并加载配置)"""
+    global _instance
+    if _instance is None:
+        _instance = ConfigManager()
+    return _instance
\ No newline at end of file
@@ -1,18 +1,151 @@
 import cv2
-import numpy as np
+import threading
+from binascii import b2a_base64
+from functools import lru_cache
+
+try:
+    import pybase64
+except ImportError:  # 未安装pybase64时使用标准库
+    pybase64 = None
+
+_CV2_SUBSAMPLING = {
+    "420": cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420,
+    "422": cv2.IMWRITE_JPEG_SAMPLING_FACTOR_422
+}
+
+# 质量检测的工作分辨率
+QUALITY_CHECK_SIZE = (640, 480)
+# 缩小图像会抬高拉普拉斯方差，实测约与缩放比例的-3次方成正比
+_SHARPNESS_SCALE_EXPONENT = 3
+
+_nj_lock = threading.Lock()  # NvJpeg实例共用一个CUDA句柄，需串行调用
+
+@lru_cache(maxsize=None)
+def _get_nvjpeg():
+    """加载nvJPEG硬件编码器 (首次编码时才初始化CUDA，避免拖慢启动)"""
+    try:
+        from nvjpeg import NvJpeg
+        return NvJpeg()
+    except Exception:  # 未安装pynvjpeg或没有可用的NVIDIA GPU
+        return None
+
+@lru_cache(maxsize=None)
+def _get_turbojpeg():
+    """
+    加载libjpeg-turbo编解码器 (首次使用时才加载动态库)
+    :return: (TurboJPEG实例, BGR像素格式, 子采样映射)，不可用时返回None
+    """
+    try:
+        from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420, TJSAMP_422
+        return TurboJPEG(), TJPF_BGR, {"420": TJSAMP_420, "422": TJSAMP_422}
+    except Exception:  # 未安装PyTurboJPEG或找不到libjpeg-turbo动态库
+        return None
+
+def encode_jpeg(image, quality=90, subsampling="422", optimize=False):
+    """
+    JPEG编码 (依次尝试nvJPEG硬件编码、libjpeg-turbo，最后回退到OpenCV)
+    :param optimize: 是否使用优化Huffman表 (体积略小但编码更慢，仅OpenCV生效)
+    :return: JPEG数据 (bytes或numpy数组，均支持缓冲区协议)
+    """
+    nj = _get_nvjpeg()
+    if nj is not None:
+        with _nj_lock:
+            return nj.encode(image, quality)
+
+    turbo = _get_turbojpeg()
+    if turbo is not None:
+        tj, pixel_format, tj_subsampling = turbo
+        return tj.encode(
+            image,
+            quality=quality,
+            pixel_format=pixel_format,
+            jpeg_subsample=tj_subsampling[subsampling]
+        )
+
+    ok, buffer = cv2.imencode('.jpg', image, [
+        cv2.IMWRITE_JPEG_QUALITY, quality,
+        cv2.IMWRITE_JPEG_SAMPLING_FACTOR, _CV2_SUBSAMPLING[subsampling],
+        cv2.IMWRITE_JPEG_OPTIMIZE, int(optimize),
+        cv2.IMWRITE_JPEG_PROGRESSIVE, 0
+    ])
+    if not ok:
+        raise ValueError("JPEG编码失败")
+    return buffer
+
+def turbojpeg_available():
+    """libjpeg-turbo是否可用"""
+    return _get_turbojpeg() is not None
+
+def decode_jpeg(data):
+    """
+    JPEG解码 (优先使用libjpeg-turbo，不可用时回退到OpenCV)
+    :return: BGR图像
+    """
+    turbo = _get_turbojpeg()
+    if turbo is not None:
+        tj, pixel_format, _ = turbo
+        return tj.decode(data, pixel_format=pixel_format)
+
+    image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("JPEG解码失败")
+    return image
+
+def encode_base64(data):
+    """
+    Base64编码 (优先使用SIMD加速的pybase64，直接读取缓冲区不额外复制)
+    :return: Base64字符串
+    """
+    if pybase64 is not None:
+        return pybase64.b64encode_as_string(memoryview(data))
+    return b2a_base64(memoryview(data), newline=False).decode('ascii')
+
+def shrink_to_fit(image, max_size):
+    """
+    按比例缩小图像到max_size (宽, 高) 以内，不放大
+    :return: 缩小后的图像 (无需缩小时返回原图)
+    """
+    height, width = image.shape[:2]
+    scale = min(max_size[0] / width, max_size[1] / height)
+    if scale >= 1:
+        return image
+    return cv2.resize(
+        image,
+        (int(width * scale), int(height * scale)),
+        interpolation=cv2.INTER_AREA
+    )
+
+def encode_preview(image, max_size=(640, 480), quality=70):
+    """
+    预览图编码：按比例缩小到max_size以内，再做JPEG与Base64编码
+    :return: Base64字符串
+    """
+    image = shrink_to_fit(image, max_size)
+    return encode_base64(encode_jpeg(image, quality, subsampling="420"))
 
 def check_image_quality(image, min_sharpness=100, min_brightness=50, max_brightness=200):
     """
-    图像质量检测
-    :return: (是否合格, 清晰度, 亮度)
+    图像质量检测 (在缩小到QUALITY_CHECK_SIZE的图像上计算)
+    :return: (是否合格, 清晰度, 亮度)，清晰度已换算为原分辨率下的拉普拉斯方差
     """
+    # 清晰度和亮度只需整体统计量，缩小后计算可大幅减少内存读写
+    height, width = image.shape[:2]
+    # 缩小超过一半会抹掉小字号文字的笔画细节，工作分辨率不低于原图的一半
+    max_size = (max(QUALITY_CHECK_SIZE[0], width // 2), max(QUALITY_CHECK_SIZE[1], height // 2))
+    image = shrink_to_fit(image, max_size)
+    scale = image.shape[1] / width
+    
     # 计算清晰度 (拉普拉斯方差)
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+    # 8位灰度图的拉普拉斯响应在[-1020, 1020]内，CV_16S不会溢出且可走整数SIMD路径
+    laplacian = cv2.Laplacian(gray, cv2.CV_16S)
+    _, stddev = cv2.meanStdDev(laplacian)
+    # 按实际缩放比例换算回原分辨率，使min_sharpness与缩放前的阈值含义一致 (未缩放时不做换算)
+    sharpness = float(stddev[0, 0]) ** 2 * scale ** _SHARPNESS_SCALE_EXPONENT
     
-    # 计算亮度 (HSV V通道平均值)
-    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-    brightness = np.mean(hsv[...,2])
+    # 计算亮度 (HSV V通道平均值，V即各像素BGR三通道的最大值，无需整幅转换HSV)
+    value = cv2.reduce(image.reshape(-1, 3), 1, cv2.REDUCE_MAX)
+    brightness = cv2.mean(value)[0]
     
     # 评估结果
     is_qualified = (